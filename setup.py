@@ -22,6 +22,7 @@ setup(
     entry_points={"console_scripts": ["tw-pywrap=tw_pywrap.cli:main"]},
     python_requires=">=3.8, <4",  # untested
     install_requires=["pyyaml>=6.0.0"],
+    extras_require={"speedups": ["orjson"]},
     packages=find_packages(exclude=("docs")),
     include_package_data=True,
     zip_safe=False,
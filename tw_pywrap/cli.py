@@ -6,7 +6,6 @@ the required options for each resource based on the Tower CLI.
 import argparse
 import logging
 import time
-import yaml
 
 from pathlib import Path
 from tw_pywrap import tower, helper, overwrite
@@ -84,6 +83,37 @@ class BlockParser:
             logger.error(f"Unrecognized resource block in YAML: {block}")
 
 
+def launch_pipelines(block_manager, args_list, max_workers=8):
+    """
+    Launches pipelines concurrently. Launches are independent of each other,
+    so each 'tw launch' is submitted to a thread pool rather than waiting for
+    the previous one to return.
+    """
+    # Imported here as it is only needed when launching pipelines
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(block_manager.handle_block, "launch", args)
+            for args in args_list
+        ]
+    # As for other blocks, a creation error aborts the run once all launches
+    # have returned. Any further creation errors are logged before re-raising.
+    creation_error = None
+    for future in futures:
+        try:
+            future.result()
+        except ResourceExistsError as e:
+            logging.error(e)
+        except ResourceCreationError as e:
+            if creation_error is None:
+                creation_error = e
+            else:
+                logging.error(e)
+    if creation_error is not None:
+        raise creation_error
+
+
 def main():
     options = parse_args()
     logging.basicConfig(level=options.log_level)
@@ -101,18 +131,31 @@ def main():
         ],
     )
     try:
-        with open(options.yaml, "r") as f:
-            data = yaml.safe_load(f)
+        data = helper.load_yaml(options.yaml)
 
         # Returns a dict that maps block names to lists of command line arguments.
-        cmd_args_dict = helper.parse_all_yaml(options.yaml, list(data.keys()))
+        cmd_args_dict = helper.parse_all_data(data, list(data.keys()))
 
+        created = False  # Whether resources were created by the previous block
         for block, args_list in cmd_args_dict.items():
+            # Later blocks may depend on resources created by earlier ones, so give
+            # Tower time to register them. Resources within a block are independent
+            # and nothing needs to wait after the last one.
+            if created:
+                time.sleep(3)
+                created = False
+            if block == "launch":
+                launch_pipelines(block_manager, args_list)
+                continue
+            # Fetch the existing resources for this block up front
+            block_manager.overwrite_method.prefetch(
+                block, [args["cmd_args"] for args in args_list]
+            )
             for args in args_list:
                 try:
                     # Run the 'tw' methods for each block
                     block_manager.handle_block(block, args)
-                    time.sleep(3)
+                    created = True
                 except ResourceExistsError as e:
                     logging.error(e)
                     continue
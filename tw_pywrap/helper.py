@@ -3,16 +3,121 @@ This file contains helper functions for the library.
 Including handling methods for each block in the YAML file, and parsing
 methods for each block in the YAML file.
 """
-import yaml
+import copy
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
 from tw_pywrap import utils
 
+# Parsed YAML files keyed by path, validated against (mtime, size) on lookup.
+_YAML_CACHE = OrderedDict()
+_YAML_CACHE_MAXSIZE = 100
+
+
+def load_yaml(file_path):
+    """
+    Load a YAML file, reusing a previously parsed copy if the file has not
+    changed since. A deep copy is returned so callers can mutate the result
+    without affecting the cached data.
+    """
+    path = os.fspath(file_path)
+    stat = os.stat(path)
+    cached = _YAML_CACHE.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+        _YAML_CACHE.move_to_end(path)
+        return copy.deepcopy(cached[2])
+
+    data = _load_json_cache(path, stat)
+    if data is None:
+        with open(path, "r") as f:
+            data = utils.safe_load_yaml(f)
+        _write_json_cache(path, stat, data)
+
+    _YAML_CACHE[path] = (stat.st_mtime, stat.st_size, data)
+    _YAML_CACHE.move_to_end(path)
+    if len(_YAML_CACHE) > _YAML_CACHE_MAXSIZE:
+        _YAML_CACHE.popitem(last=False)
+    return copy.deepcopy(data)
+
+
+def _json_cache_path(path):
+    """
+    Path of the JSON copy of a YAML file in the per-user cache directory
+    ($XDG_CACHE_HOME/tw-pywrap or ~/.cache/tw-pywrap), named after a hash of the
+    YAML file's absolute path.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_home, "tw-pywrap", f"{digest}.json")
+
+
+def _load_json_cache(path, stat):
+    """
+    Return the data stored in the JSON copy of a YAML file if it was written for
+    the current version of the same file (same absolute path, mtime and size),
+    otherwise None.
+    """
+    try:
+        with open(_json_cache_path(path), "r") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(cached, dict)
+        or cached.get("source") != os.path.abspath(path)
+        or cached.get("mtime") != stat.st_mtime
+        or cached.get("size") != stat.st_size
+    ):
+        return None
+    return cached.get("data")
+
+
+def _write_json_cache(path, stat, data):
+    """
+    Store parsed YAML data as JSON in the cache directory so later runs can skip
+    the YAML parse. Data that does not survive a JSON round trip (e.g. dates or
+    non-string keys) is not cached, and failures to write are ignored.
+    """
+    try:
+        payload = json.dumps(
+            {
+                "source": os.path.abspath(path),
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "data": data,
+            }
+        )
+    except (TypeError, ValueError):
+        return
+    if json.loads(payload)["data"] != data:
+        return
+
+    cache_path = _json_cache_path(path)
+    temp_name = None
+    try:
+        os.makedirs(os.path.dirname(cache_path), mode=0o700, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            mode="w", dir=os.path.dirname(cache_path), delete=False
+        ) as temp_file:
+            temp_name = temp_file.name
+            temp_file.write(payload)
+        os.replace(temp_name, cache_path)
+    except OSError:
+        if temp_name is not None and os.path.exists(temp_name):
+            os.unlink(temp_name)
+
 
 def parse_yaml_block(file_path, block_name):
-    # Load the YAML file.
-    with open(file_path, "r") as f:
-        data = yaml.safe_load(f)
+    # Load the YAML file and parse the specified block.
+    return parse_data_block(load_yaml(file_path), block_name)
+
 
-    # Get the specified block.
+def parse_data_block(data, block_name):
+    # Get the specified block from the already loaded YAML data.
     block = data.get(block_name)
 
     # Initialize an empty list to hold the lists of command line arguments.
@@ -39,6 +144,11 @@ def parse_yaml_block(file_path, block_name):
 
 
 def parse_all_yaml(file_path, block_names):
+    # Load the YAML file once and parse all of the requested blocks.
+    return parse_all_data(load_yaml(file_path), block_names)
+
+
+def parse_all_data(data, block_names):
     resource_order = [
         "organizations",
         "teams",
@@ -60,7 +170,7 @@ def parse_all_yaml(file_path, block_names):
         # Check if the block name is present in the provided block_names list
         if block_name in block_names:
             # Parse the block and add its command arguments to the dictionary.
-            block_name, cmd_args_list = parse_yaml_block(file_path, block_name)
+            block_name, cmd_args_list = parse_data_block(data, block_name)
             cmd_args_dict[block_name] = cmd_args_list
 
     # Return the dictionary of command arguments.
@@ -68,22 +178,15 @@ def parse_all_yaml(file_path, block_names):
 
 
 def parse_block(block_name, item):
-    # Define the mapping from block names to functions.
-    block_to_function = {
-        "credentials": parse_credentials_block,
-        "compute-envs": parse_compute_envs_block,
-        "teams": parse_teams_block,
-        "actions": parse_actions_block,
-        "datasets": parse_datasets_block,
-        "pipelines": parse_pipelines_block,
-        "launch": parse_launch_block,
-    }
-    # Use the generic block function as a default.
-    parse_fn = block_to_function.get(block_name, parse_generic_block)
+    # Use the table-driven generic block function as a default.
+    parse_fn = _BLOCK_PARSERS.get(block_name)
     overwrite = item.pop("overwrite", False)
 
     # Call the appropriate function and return its result along with overwrite value.
-    cmd_args = parse_fn(item)
+    if parse_fn is None:
+        cmd_args = parse_generic_block(item, block_name)
+    else:
+        cmd_args = parse_fn(item)
     return {"cmd_args": cmd_args, "overwrite": overwrite}
 
 
@@ -91,31 +194,41 @@ def parse_block(block_name, item):
 # for structuring command line arguments in a certain way
 
 
-def parse_generic_block(item):
-    cmd_args = []
-    for key, value in item.items():
-        cmd_args.extend([f"--{key}", str(value)])
-    return cmd_args
+# Keys passed as positional arguments (e.g. the credentials type or pipeline
+# url) rather than as '--key value' options, per block.
+_POSITIONAL = {
+    "credentials": frozenset(["type"]),
+    "compute-envs": frozenset(["file-path"]),
+    "actions": frozenset(["type"]),
+    "pipelines": frozenset(["url", "file-path"]),
+    "launch": frozenset(["pipeline", "url"]),
+}
 
+# Blocks whose 'params' are written to a temporary file passed with --params-file
+_PARAMS_KEY = frozenset(["actions", "pipelines", "launch"])
 
-def parse_credentials_block(item):
-    cmd_args = []
-    for key, value in item.items():
-        if key == "type":
-            cmd_args.append(str(value))
-        else:
-            cmd_args.extend([f"--{key}", str(value)])
-    return cmd_args
 
+def parse_generic_block(item, block_name=None):
+    """
+    Parse an item into command line arguments: positional arguments for the
+    block come first, then --params-file if the block supports 'params', then
+    '--key value' pairs for the remaining keys.
+    """
+    positional = _POSITIONAL.get(block_name, frozenset())
+    has_params = block_name in _PARAMS_KEY
 
-def parse_compute_envs_block(item):
+    repo_args = []
+    params_args = []
     cmd_args = []
     for key, value in item.items():
-        if key == "file-path":
-            cmd_args.append(str(value))
+        if key in positional:
+            repo_args.append(str(value))
+        elif has_params and key == "params":
+            temp_file_name = utils.create_temp_yaml(value)
+            params_args.extend(["--params-file", temp_file_name])
         else:
             cmd_args.extend([f"--{key}", str(value)])
-    return cmd_args
+    return repo_args + params_args + cmd_args
 
 
 def parse_teams_block(item):
@@ -145,20 +258,6 @@ def parse_teams_block(item):
     return (cmd_args, members_cmd_args)
 
 
-def parse_actions_block(item):
-    cmd_args = []
-    temp_file_name = None
-    for key, value in item.items():
-        if key == "type":
-            cmd_args.append(str(value))
-        elif key == "params":
-            temp_file_name = utils.create_temp_yaml(value)
-            cmd_args.extend(["--params-file", temp_file_name])
-        else:
-            cmd_args.extend([f"--{key}", str(value)])
-    return cmd_args
-
-
 def parse_datasets_block(item):
     cmd_args = []
     for key, value in item.items():
@@ -179,41 +278,12 @@ def parse_datasets_block(item):
     return cmd_args
 
 
-def parse_pipelines_block(item):
-    cmd_args = []
-    repo_args = []
-    params_args = []
-
-    for key, value in item.items():
-        if key == "url":
-            repo_args.extend([str(value)])
-        elif key == "params":
-            temp_file_name = utils.create_temp_yaml(value)
-            params_args.extend(["--params-file", temp_file_name])
-        elif key == "file-path":
-            repo_args.extend([str(value)])
-        else:
-            cmd_args.extend([f"--{key}", str(value)])
-
-    # First append the url related arguments then append the remaining ones
-    cmd_args = repo_args + params_args + cmd_args
-    return cmd_args
-
-
-def parse_launch_block(item):
-    repo_args = []
-    cmd_args = []
-    for key, value in item.items():
-        if key == "pipeline" or key == "url":
-            repo_args.extend([str(value)])
-        elif key == "params":
-            temp_file_name = utils.create_temp_yaml(value)
-            cmd_args.extend(["--params-file", temp_file_name])
-        else:
-            cmd_args.extend([f"--{key}", str(value)])
-    cmd_args = repo_args + cmd_args
-
-    return cmd_args
+# Mapping from block names to the functions used to parse them in parse_block().
+# Other blocks are parsed by parse_generic_block() using _POSITIONAL and _PARAMS_KEY.
+_BLOCK_PARSERS = {
+    "teams": parse_teams_block,
+    "datasets": parse_datasets_block,
+}
 
 
 # Handlers to call the actual tower method,based on the block name.
@@ -224,16 +294,16 @@ def handle_generic_block(tw, block, args, method_name="add"):
     # Generic handler for most blocks, with optional method name
     method = getattr(tw, block)
     if method_name is None:
-        method(*args)
+        method(*args, capture=False)
     else:
-        method(method_name, *args)
+        method(method_name, *args, capture=False)
 
 
 def handle_teams(tw, args):
     cmd_args, members_cmd_args = args
-    tw.teams("add", *cmd_args)
+    tw.teams("add", *cmd_args, capture=False)
     for sublist in members_cmd_args:
-        tw.teams("members", *sublist)
+        tw.teams("members", *sublist, capture=False)
 
 
 def handle_participants(tw, args):
@@ -245,20 +315,21 @@ def handle_participants(tw, args):
         for i, arg in enumerate(args)
         if not (args[i - 1] == skip_key or arg == skip_key)
     ]
-    method("add", *new_args)
-    method("update", *args)
+    method("add", *new_args, capture=False)
+    method("update", *args, capture=False)
 
 
 def handle_pipelines(tw, args):
     method = getattr(tw, "pipelines")
-    for arg in args:
-        # Check if arg is a url or a json file.
-        # If it is, use the appropriate method and break.
-        if utils.is_url(arg):
-            method("add", *args)
-            break
-        elif ".json" in arg:
-            method("import", *args)
+    if not args:
+        return
+    # parse_generic_block() places the url or json file (the _POSITIONAL keys
+    # for pipelines) first, so only the first arg needs checking to choose
+    # the appropriate method.
+    if utils.is_url(args[0]):
+        method("add", *args, capture=False)
+    elif args[0].endswith(".json"):
+        method("import", *args, capture=False)
 
 
 def find_name(cmd_args):
@@ -1,4 +1,3 @@
-import json
 from tw_pywrap import utils
 from tw_pywrap.tower import ResourceExistsError
 import logging
@@ -13,14 +12,16 @@ class Overwrite:
     """
 
     # Define blocks for simple overwrite with --name and --workspace
-    generic_deletion = [
-        "credentials",
-        "secrets",
-        "compute-envs",
-        "datasets",
-        "actions",
-        "pipelines",
-    ]
+    generic_deletion = frozenset(
+        [
+            "credentials",
+            "secrets",
+            "compute-envs",
+            "datasets",
+            "actions",
+            "pipelines",
+        ]
+    )
 
     def __init__(self, tw):
         """
@@ -32,12 +33,18 @@ class Overwrite:
         Attributes:
         tw: A Tower class instance used to execute Tower CLI commands.
         cached_jsondata: A cached placeholder for JSON data. Default value is None.
-        block_jsondata: A dictionary to store JSON data for each block.
-        Key is the block name, and value is the corresponding JSON data.
+        block_jsondata: A dictionary to store JSON data for each block and scope.
+        Key is a tuple of the block name and the scope arguments passed to list()
+        (e.g. ('pipelines', '-w', 'my_org/my_workspace')), and value is the
+        corresponding JSON data.
+        block_index: A dictionary of lookup tables built from the JSON data in
+        block_jsondata, see _get_index().
         """
         self.tw = tw
         self.cached_jsondata = None
-        self.block_jsondata = {}  # New dict to hold JSON data per block
+        self.cached_key = None  # (block, *scope) key of cached_jsondata
+        self.block_jsondata = {}  # Dict to hold JSON data per block and scope
+        self.block_index = {}  # Dict to hold lookup tables per block and scope
 
         # Define special handlers for resources deleted with specific args
         self.block_operations = {
@@ -63,32 +70,30 @@ class Overwrite:
             },
         }
 
+        # Handler shared by all blocks in generic_deletion
+        self.generic_operation = {
+            "keys": ["name", "workspace"],
+            "method_args": self._get_generic_deletion_args,
+            "name_key": "name",
+        }
+
     def handle_overwrite(self, block, args, overwrite=False):
         """
         Handles overwrite functionality for Tower resources and
         calling the 'tw delete' method with the correct args.
         """
-        if block in Overwrite.generic_deletion:
-            self.block_operations[block] = {
-                "keys": ["name", "workspace"],
-                "method_args": self._get_generic_deletion_args,
-                "name_key": "name",
-            }
-
-        if block in self.block_operations:
-            operation = self.block_operations[block]
+        operation = self._get_operation(block)
+        if operation is not None:
             keys_to_get = operation["keys"]
             self.cached_jsondata, tw_args = self._get_json_data(
                 block, args, keys_to_get
             )
 
-            if block == "participants":
-                if tw_args.get("type") == "TEAM":
-                    self.block_operations["participants"]["name_key"] = "teamName"
-                else:
-                    self.block_operations["participants"]["name_key"] = "email"
+            name_key = operation["name_key"]
+            if block == "participants" and tw_args.get("type") == "TEAM":
+                name_key = "teamName"
 
-            if self.check_resource_exists(operation["name_key"], tw_args):
+            if self.check_resource_exists(name_key, tw_args):
                 # if resource exists, delete
                 if overwrite:
                     logging.debug(
@@ -103,6 +108,63 @@ class Overwrite:
                         " in your config file.\n"
                     )
 
+    def prefetch(self, block, args_list, max_concurrency=8):
+        """
+        Fetches the json data from the list() method for every scope
+        (organization or workspace) used by the resources in a block before
+        handle_overwrite() is called for each of them. The 'tw list' calls are
+        independent of each other, so they are run concurrently and cached in
+        self.block_jsondata. Failed calls are not cached, and will be retried
+        and reported by handle_overwrite().
+        """
+        if self._get_operation(block) is None:
+            return
+
+        keys = {}  # Used as an ordered set of (block, *scope) keys
+        for args in args_list:
+            if block == "teams":
+                tw_args = self._get_values_from_cmd_args(args[0], ["organization"])
+            else:
+                tw_args = self._get_values_from_cmd_args(args, ["workspace"])
+            key = (block,) + self._get_list_scope(block, tw_args)
+            if None not in key and key not in self.block_jsondata:
+                keys[key] = None
+
+        # Nothing to gain from running a single 'tw list' call concurrently
+        if len(keys) > 1:
+            # Imported here to keep asyncio off the CLI start-up path
+            import asyncio
+
+            asyncio.run(self._prefetch_async(keys, max_concurrency))
+
+    async def _prefetch_async(self, keys, max_concurrency):
+        """
+        Runs the list() method for each (block, *scope) key concurrently,
+        with at most max_concurrency 'tw' processes at a time.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def list_json(key):
+            block, *scope = key
+            async with semaphore:
+                json_out = await self.tw._tw_run_async(
+                    ["-o", "json", block, "list", *scope]
+                )
+            self.block_jsondata[key] = json_out
+
+        await asyncio.gather(*(list_json(key) for key in keys), return_exceptions=True)
+
+    def _get_operation(self, block):
+        """
+        Returns the operation dictionary used to overwrite resources in a block,
+        or None if overwrite is not supported for the block.
+        """
+        if block in Overwrite.generic_deletion:
+            return self.generic_operation
+        return self.block_operations.get(block)
+
     def _get_organization_args(self, args):
         """
         Returns a list of arguments for the delete() method for organizations.
@@ -112,21 +174,12 @@ class Overwrite:
     def _get_team_args(self, args):
         """
         Returns a list of arguments for the delete() method for teams. The teamId
-        used to delete will be retrieved using the find_key_value_in_dict() method.
+        used to delete will be retrieved from the team names in the json data.
         """
-        jsondata = self.block_jsondata.get("teams", None)
-
-        if not jsondata:
-            json_method = getattr(self.tw, "-o json")
-            json_out = json_method("teams", "list", "-o", args["organization"])
-            self.block_jsondata["teams"] = json_out
-        else:
-            json_out = jsondata
-
-        # Get the teamId from the json data
-        team_id = utils.find_key_value_in_dict(
-            json.loads(json_out), "name", args["name"], "teamId"
+        team_ids = self._get_index(
+            ("teams", "-o", args["organization"]), "name", "teamId"
         )
+        team_id = team_ids.get(args["name"])
         return ("delete", "--id", str(team_id), "--organization", args["organization"])
 
     def _get_participant_args(self, args):
@@ -153,7 +206,7 @@ class Overwrite:
         method.
         """
         workspace_id = self._find_workspace_id(
-            json.loads(self.tw.workspaces.list("-o", "json")),
+            utils.load_json(self._list_json("workspaces")),
             args["organization"],
             args["name"],
         )
@@ -177,45 +230,66 @@ class Overwrite:
         For the specified keys in the operations dictionary, get the values from
         the command line arguments and return a dictionary of values.
 
-        Also, gets json data from Tower by calling the list() method once and caches
-        the json data for that block in self.block_jsondata. If the block data already
-        exists, it will be retrieved from the dictionary instead of calling the list().
+        Also, gets json data from Tower by calling the list() method once per block
+        and scope (organization or workspace), see _list_json().
 
         Returns a tuple of json data and a dictionary of values to run delete() on.
         """
-        json_method = getattr(self.tw, "-o json")
-        tw_args = []  # Default value for tw_args
-
-        # Check if block data already exists
-        if block in self.block_jsondata:
-            self.cached_jsondata = self.block_jsondata[block]
-            tw_args = self._get_values_from_cmd_args(args, keys_to_get)
+        if block == "teams":
+            tw_args = self._get_values_from_cmd_args(args[0], keys_to_get)
         else:
-            # Fetch the data if it does not exist
-            if block == "teams":
-                tw_args = self._get_values_from_cmd_args(args[0], keys_to_get)
-                self.cached_jsondata = json_method(
-                    block, "list", "-o", tw_args["organization"]
-                )
-            elif block in Overwrite.generic_deletion or block == "participants":
-                tw_args = self._get_values_from_cmd_args(args, keys_to_get)
-                self.cached_jsondata = json_method(
-                    block, "list", "-w", tw_args["workspace"]
-                )
-            else:
-                tw_args = self._get_values_from_cmd_args(args, keys_to_get)
-                self.cached_jsondata = json_method(block, "list")
+            tw_args = self._get_values_from_cmd_args(args, keys_to_get)
 
-        # Store this data in the block_jsondata dict for later use
-        self.block_jsondata[block] = self.cached_jsondata
+        scope = self._get_list_scope(block, tw_args)
+        self.cached_key = (block,) + scope
+        self.cached_jsondata = self._list_json(block, *scope)
         return self.cached_jsondata, tw_args
 
+    def _get_list_scope(self, block, tw_args):
+        """
+        Returns the arguments that scope the list() method for a block to an
+        organization or workspace.
+        """
+        if block == "teams":
+            return ("-o", tw_args["organization"])
+        elif block in Overwrite.generic_deletion or block == "participants":
+            return ("-w", tw_args["workspace"])
+        return ()
+
+    def _list_json(self, block, *scope):
+        """
+        Returns the json data from the list() method for a block and scope. The
+        json data is cached in self.block_jsondata so that list() is only called
+        once per block and scope, until a resource in that scope is deleted.
+        """
+        key = (block,) + scope
+        if key not in self.block_jsondata:
+            json_method = getattr(self.tw, "-o json")
+            self.block_jsondata[key] = json_method(block, "list", *scope)
+        return self.block_jsondata[key]
+
+    def _get_index(self, key, target_key, return_key=None):
+        """
+        Returns a dictionary mapping each value of target_key in the json data for
+        a (block, *scope) key to the value of return_key in the same object (or
+        True if return_key is None). The json data is parsed and indexed once, so
+        repeated lookups in the same scope do not rescan it.
+        """
+        index_key = (key, target_key, return_key)
+        if index_key not in self.block_index:
+            json_out = self._list_json(*key)
+            data = utils.load_json(json_out) if json_out else {}
+            self.block_index[index_key] = utils.index_key_values(
+                data, target_key, return_key
+            )
+        return self.block_index[index_key]
+
     def check_resource_exists(self, name_key, tw_args):
         """
         Check if a resource exists in Tower by looking for the name and value
         in the json data generated from the list() method.
         """
-        return utils.check_if_exists(self.cached_jsondata, name_key, tw_args["name"])
+        return tw_args["name"] in self._get_index(self.cached_key, name_key)
 
     def _delete_resource(self, block, operation, tw_args):
         """
@@ -224,33 +298,45 @@ class Overwrite:
         """
         method_args = operation["method_args"](tw_args)
         method = getattr(self.tw, block)
-        method(*method_args)
+        method(*method_args, capture=False)
+
+        # The cached list() output and lookup tables for this scope are now stale
+        key = (block,) + self._get_list_scope(block, tw_args)
+        self.block_jsondata.pop(key, None)
+        self.block_index = {
+            index_key: index
+            for index_key, index in self.block_index.items()
+            if index_key[0] != key
+        }
 
     def _get_values_from_cmd_args(self, cmd_args, keys):
         """
         Return a dictionary of values from a list of command line arguments based
         on a input list of keys.
         """
-        values = {key: None for key in keys}
-        key = None
-
-        for arg in cmd_args:
-            if arg.startswith("--"):
-                key = arg[2:]
-            else:
-                if key and key in keys:
-                    values[key] = arg
-                key = None
+        key_set = frozenset(keys)
+        values = dict.fromkeys(keys)
+        # Pair each argument with the one that follows it, so positional
+        # arguments (e.g. credential type or pipeline URL) are skipped over.
+        values.update(
+            {
+                flag[2:]: value
+                for flag, value in zip(cmd_args, cmd_args[1:])
+                if flag.startswith("--")
+                and flag[2:] in key_set
+                and not value.startswith("--")
+            }
+        )
         return values
 
-    def _find_workspace_id(self, organization, workspace_name):
+    def _find_workspace_id(self, jsondata, organization, workspace_name):
         """
         Custom method to find a workspace ID in a nested dictionary with a given
         organization name and workspace name. This ID will be used to delete the
         workspace.
         """
-        if "workspaces" in self.cached_jsondata:
-            workspaces = self.cached_jsondata["workspaces"]
+        if "workspaces" in jsondata:
+            workspaces = jsondata["workspaces"]
             for workspace in workspaces:
                 if (
                     workspace.get("orgName") == organization
@@ -1,10 +1,11 @@
-import json
 import logging
+import os
 import subprocess
 import shlex
 import re
+from tw_pywrap import utils
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 
 class Tower:
@@ -22,20 +23,73 @@ class Tower:
         def __init__(self, tw_instance, cmd):
             self.tw_instance = tw_instance
             self.cmd = cmd
+            self.cmd_parts = cmd.split()
 
         def __call__(self, *args, **kwargs):
-            command = self.cmd.split()
+            command = list(self.cmd_parts)
             command.extend(args)
             return self.tw_instance._tw_run(command, **kwargs)
 
     # Constructs a new Tower instance with a specified workspace
     def __init__(self):
-        pass
+        self._cmd_cache = {}  # TwCommand objects by subcommand name
 
     # Executes a 'tw' command in a subprocess and returns the output.
     def _tw_run(self, cmd, *args, **kwargs):
         """
-        Run a tw command with supplied commands
+        Run a tw command with supplied commands. Pass capture=False when the
+        output is not needed: stdout is then discarded, only stderr and the exit
+        code are used for error handling, and an empty string is returned.
+        """
+        command, to_json = self._build_command(cmd, *args, **kwargs)
+
+        if not kwargs.get("capture", True):
+            process = subprocess.Popen(
+                command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            with process.stderr:
+                stderr = process.stderr.read()
+            process.wait()
+            self._check_output(stderr, False)
+            # Errors printed on the discarded stdout are caught by the exit code
+            if process.returncode != 0:
+                raise ResourceCreationError(
+                    f" Resource creation failed with exit code {process.returncode}"
+                    f" and the following error: '{stderr.decode('utf-8').strip()}'.\n"
+                    "Please check your config file and try again.\n"
+                )
+            return ""
+
+        # Run the command and return the stdout
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        with process.stdout:
+            stdout = process.stdout.read()
+        process.wait()
+        return self._check_output(stdout, to_json)
+
+    # Executes a 'tw' command in an asyncio subprocess and returns the output.
+    async def _tw_run_async(self, cmd, *args, **kwargs):
+        """
+        Run a tw command with supplied commands without blocking the event loop,
+        so that independent commands can be awaited concurrently.
+        """
+        # Imported here to keep asyncio off the CLI start-up path
+        import asyncio
+
+        command, to_json = self._build_command(cmd, *args, **kwargs)
+
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+        stdout, _ = await process.communicate()
+        return self._check_output(stdout, to_json)
+
+    def _build_command(self, cmd, *args, **kwargs):
+        """
+        Build the full 'tw' argument list for a command. Returns a tuple of the
+        argument list and whether the output should be parsed as JSON.
         """
         command = ["tw"]
         if kwargs.get("to_json"):
@@ -54,16 +108,35 @@ class Tower:
             params_path = kwargs["params_file"]
             command.append(f"--params-file={params_path}")
 
-        full_cmd = " ".join(
-            arg if arg.startswith("$") else shlex.quote(arg) for arg in command
-        )
-        logging.debug(f" Running command: {full_cmd}\n")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(" Running command: %s\n", shlex.join(command))
 
-        # Run the command and return the stdout
-        process = subprocess.Popen(
-            full_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True
-        )
-        stdout, _ = process.communicate()
+        # Expand environment variables (e.g. '$TOWER_GITHUB_PASSWORD') here
+        # since the command is not run through a shell.
+        command = [self._expand_env_var(arg) for arg in command]
+        return command, to_json
+
+    def _expand_env_var(self, arg):
+        """
+        Expand environment variables in an argument starting with '$'. Raises an
+        error if the variable is not set, rather than passing the placeholder on
+        (e.g. as a credential password).
+        """
+        if not arg.startswith("$"):
+            return arg
+        match = re.match(r"\$\{?(\w+)", arg)
+        if match and match.group(1) not in os.environ:
+            raise ResourceCreationError(
+                f" Environment variable '{match.group(1)}' is not set.\n"
+                "Please export it and try again.\n"
+            )
+        return os.path.expandvars(arg)
+
+    def _check_output(self, stdout, to_json):
+        """
+        Decode the output of a 'tw' command and raise an error if the command
+        failed, otherwise return the output.
+        """
         stdout = stdout.decode("utf-8").strip()
 
         # Error handling for stdout
@@ -79,7 +152,7 @@ class Tower:
                     "Please check your config file and try again.\n"
                 )
             elif to_json is True:
-                return json.loads(stdout)
+                return utils.load_json(stdout)
             else:
                 return stdout
 
@@ -87,10 +160,15 @@ class Tower:
     def __getattr__(self, cmd):
         """
         Magic method to allow any 'tw' subcommand to be called as a method.
-        Returns a TwCommand object that can be called with arguments.
+        Returns a TwCommand object that can be called with arguments. The object is
+        cached, so repeated calls to the same subcommand reuse it.
         """
-        cmd = cmd.replace("_", "-")  # replace underscores with hyphens
-        return self.TwCommand(self, cmd)
+        # Looked up via __dict__ to avoid recursing into __getattr__
+        cmd_cache = self.__dict__.setdefault("_cmd_cache", {})
+        if cmd not in cmd_cache:
+            # replace underscores with hyphens
+            cmd_cache[cmd] = self.TwCommand(self, cmd.replace("_", "-"))
+        return cmd_cache[cmd]
 
 
 class ResourceExistsError(Exception):
@@ -1,64 +1,81 @@
-import json
+import hashlib
+import os
+import stat
 import tempfile
-import yaml
 from urllib.parse import urlparse
 
+try:
+    # orjson is optional, but parses large 'tw -o json' responses much faster
+    import orjson
 
-def find_key_value_in_dict(data, target_key, target_value, return_key):
+    load_json = orjson.loads
+except ImportError:
+    import json
+
+    load_json = json.loads
+
+
+def index_key_values(data, target_key, return_key=None):
     """
-    Generic method to find a key-value pair in a nested dictionary and within
-    lists of dictionaries.
-    Can use the input of json.loads() converting JSON string to dict.
-    #TODO: huge candidate for refactoring
+    Build a lookup table from a nested dictionary (and lists of dictionaries),
+    mapping every value of target_key to the value of return_key in the same
+    dictionary, or to True if return_key is None. Can use the input of
+    load_json() converting JSON string to dict. All values are indexed in a
+    single pass over the data. Dictionaries are visited depth-first, each one
+    before its children, and for each value of target_key the first dictionary
+    with a return_key value that is not None wins.
     """
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if key == target_key and value == target_value:
-                # If we find our target key-value pair,
-                # return the value of the specified return key if it is not None
-                if return_key is not None:
-                    return data.get(return_key)
-                else:
-                    # or any other value to indicate the existence of the key-value pair
-                    return True
-            if isinstance(value, dict):
-                result = find_key_value_in_dict(
-                    value, target_key, target_value, return_key
-                )
-                if result:
-                    return result
-            if isinstance(value, list):
-                for item in value:
-                    result = find_key_value_in_dict(
-                        item, target_key, target_value, return_key
-                    )
-                    if result:
-                        return result
-    elif isinstance(data, list):
-        for item in data:
-            result = find_key_value_in_dict(item, target_key, target_value, return_key)
-            if result:
-                return result
-    return None
-
-
-def check_if_exists(json_data, namekey, namevalue):
+    index = {}
+    stack = [data]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            value = current.get(target_key)
+            if value is not None and not isinstance(value, (dict, list)):
+                if return_key is None:
+                    index.setdefault(value, True)
+                elif index.get(value) is None:
+                    # Keep looking for a later match if there is no value to return
+                    index[value] = current.get(return_key)
+            children = current.values()
+        elif isinstance(current, list):
+            children = current
+        else:
+            continue
+        # Reversed so children are popped from the stack in their original order
+        stack.extend(
+            child
+            for child in reversed(list(children))
+            if isinstance(child, (dict, list))
+        )
+    return index
+
+
+def safe_load_yaml(stream):
     """
-    Wrapper around find_key_value_in_dict() to validate that a resource was
-    created successfully in Tower by looking for the name and value.
+    Parse YAML from a string or file, using the libyaml bindings when PyYAML
+    was built with them. PyYAML is imported here rather than at module level
+    as it is only needed once a config file is actually read.
     """
-    data = json.loads(json_data)
-    if find_key_value_in_dict(data, namekey, namevalue, return_key=None):
-        return True
+    import yaml
+
+    try:
+        from yaml import CSafeLoader as SafeLoader
+    except ImportError:
+        from yaml import SafeLoader
+
+    return yaml.load(stream, Loader=SafeLoader)
 
 
 def is_valid_yaml(file_path):
     """
     Check if a file is valid YAML
     """
+    import yaml
+
     try:
         with open(file_path, "r") as file:
-            yaml.safe_load(file)
+            safe_load_yaml(file)
         return True
     except yaml.YAMLError:
         return False
@@ -88,8 +105,11 @@ def is_url(s):
 
 def create_temp_yaml(params_dict):
     """
-    Create a generic temporary yaml file given a dictionary
+    Create a generic temporary yaml file given a dictionary. The file is named
+    after a hash of its content, so identical params (e.g. shared by several
+    pipelines, or across runs) are written to disk once and the file is reused.
     """
+    import yaml
 
     class quoted_str(str):
         pass
@@ -102,8 +122,34 @@ def create_temp_yaml(params_dict):
         if k == "outdir" and isinstance(v, str):
             params_dict[k] = quoted_str(v)
 
+    content = yaml.dump(params_dict)
+    digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+    file_name = os.path.join(tempfile.gettempdir(), f"tw-pywrap-params-{digest}.yaml")
+    if _is_own_file(file_name):
+        return file_name
+
     with tempfile.NamedTemporaryFile(
         mode="w", delete=False, suffix=".yaml"
     ) as temp_file:
-        yaml.dump(params_dict, temp_file)
+        temp_file.write(content)
+    try:
+        os.replace(temp_file.name, file_name)
+    except OSError:
+        # e.g. the file exists but belongs to another user, use the unique name
         return temp_file.name
+    return file_name
+
+
+def _is_own_file(file_name):
+    """
+    Check if a file exists, is a regular file (not a symlink) and belongs to the
+    current user, so that files left in a shared temporary directory by other
+    users are never reused.
+    """
+    try:
+        file_stat = os.lstat(file_name)
+    except OSError:
+        return False
+    if not stat.S_ISREG(file_stat.st_mode):
+        return False
+    return not hasattr(os, "getuid") or file_stat.st_uid == os.getuid()